@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+AIS Dry Bulk Vessel Data Analyzer
+Analyzes position data collected by the AIS scraper and produces
+statistics, plots and a text summary report
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import io
+import json
+import os
+import pathlib
+import pickle
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# matplotlib/seaborn are imported lazily in create_visualizations so the
+# report-only path doesn't pay their import cost
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        def wrap(func):
+            return func
+        return wrap
+    prange = range
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _haversine_per_group(lat, lon, offsets, out):
+    """Cumulative great-circle distance (km) per vessel group.
+
+    lat/lon must be sorted by (mmsi, timestamp); offsets delimits each
+    vessel's contiguous slice.
+    """
+    deg2rad = 0.017453292519943295
+    for g in prange(len(offsets) - 1):
+        start, end = offsets[g], offsets[g + 1]
+        acc = 0.0
+        for i in range(start + 1, end):
+            phi1 = lat[i - 1] * deg2rad
+            phi2 = lat[i] * deg2rad
+            dphi = (lat[i] - lat[i - 1]) * deg2rad
+            dlmb = (lon[i] - lon[i - 1]) * deg2rad
+            a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+            acc += 2.0 * np.arcsin(np.sqrt(a))
+        out[g] = acc * 6371.0
+
+class AISDataAnalyzer:
+    def __init__(self, csv_path: str = "ais_data/dry_bulk_vessels.csv", vessel_db_path: str = "ais_data/vessel_database.json"):
+        self.csv_path = csv_path
+        self.vessel_db_path = vessel_db_path
+        self.df = None
+        self.vessel_db = {}
+        self._valid_speed = None  # shared NaN mask over speed_knots
+
+    # Columns any of the analyses actually touch
+    ANALYSIS_COLUMNS = ['mmsi', 'timestamp', 'latitude', 'longitude',
+                        'speed_knots', 'estimated_dwt', 'vessel_name', 'destination']
+
+    # Explicit CSV dtypes: skips pandas type inference on the parse path
+    CSV_DTYPES = {
+        'mmsi': 'int32',
+        'latitude': 'float32',
+        'longitude': 'float32',
+        'speed_knots': 'float32',
+        'estimated_dwt': 'float32',
+        'vessel_name': 'category',
+        'destination': 'category',
+    }
+
+    # Fixed schema for the Parquet sidecar cache
+    PARQUET_SCHEMA = pa.schema([
+        ('mmsi', pa.int32()),
+        ('timestamp', pa.timestamp('ns', tz='UTC')),
+        ('latitude', pa.float32()),
+        ('longitude', pa.float32()),
+        ('speed_knots', pa.float32()),
+        ('estimated_dwt', pa.float32()),
+        ('vessel_name', pa.dictionary(pa.int32(), pa.string())),
+        ('destination', pa.dictionary(pa.int32(), pa.string())),
+    ])
+
+    def load_data(self) -> bool:
+        """Load collected position data via a Parquet sidecar cache.
+
+        The CSV is converted to a Parquet sidecar on first run (and whenever
+        the CSV is newer than the sidecar); subsequent runs read the columnar
+        file directly, skipping CSV parsing and timestamp re-parsing entirely.
+        """
+        if not os.path.exists(self.csv_path):
+            print(f"Error: {self.csv_path} not found. Run the scraper first.")
+            return False
+
+        # Fast path for repeated runs (e.g. different --days on the same
+        # CSV): unpickle the fully transformed frame, keyed by CSV mtime
+        key = hashlib.md5(
+            f"{self.csv_path}:{os.path.getmtime(self.csv_path)}".encode()).hexdigest()
+        state_cache = os.path.join(
+            os.path.dirname(self.csv_path) or '.', f".ais_cache_{key}.pkl")
+        if os.path.exists(state_cache):
+            with open(state_cache, 'rb') as f:
+                self.df, self._name_by_mmsi = pickle.load(f)
+            self._ts = self.df['timestamp'].dt.tz_localize(None).to_numpy()
+        else:
+            parquet_path = self.csv_path + ".parquet"
+            if (not os.path.exists(parquet_path)
+                    or os.path.getmtime(parquet_path) < os.path.getmtime(self.csv_path)):
+                self._build_parquet_cache(parquet_path)
+
+            self.df = pd.read_parquet(parquet_path, engine='pyarrow', columns=self.ANALYSIS_COLUMNS)
+            self._optimize_dtypes()
+
+            # Invalidation is automatic (the mtime is in the key); stale
+            # caches for older CSV versions just get swept here
+            for stale in glob.glob(os.path.join(
+                    os.path.dirname(state_cache) or '.', ".ais_cache_*.pkl")):
+                os.remove(stale)
+            with open(state_cache, 'wb') as f:
+                pickle.dump((self.df, self._name_by_mmsi), f, protocol=5)
+
+        if os.path.exists(self.vessel_db_path):
+            try:
+                with open(self.vessel_db_path, 'r') as f:
+                    self.vessel_db = {str(v['mmsi']): v for v in json.load(f)}
+            except Exception as e:
+                print(f"Warning: could not load vessel database: {e}")
+
+        # Overlay richer static-data names from the vessel database
+        for mmsi_str, vessel in self.vessel_db.items():
+            name = vessel.get('name')
+            if name and name != 'Unknown' and mmsi_str.isdigit():
+                mmsi = int(mmsi_str)
+                if mmsi in self._name_by_mmsi:
+                    self._name_by_mmsi[mmsi] = name
+
+        print(f"Loaded {len(self.df):,} position records for {self.df['mmsi'].nunique():,} vessels")
+        return True
+
+    def _optimize_dtypes(self):
+        """Downcast numeric columns and categorize repeated strings.
+
+        Halves DataFrame memory versus the pandas defaults and speeds up
+        groupby/value_counts/masking since categoricals compare int codes.
+        """
+        self.df = self.df.sort_values('timestamp').reset_index(drop=True)
+        self.df = self.df.astype({
+            'mmsi': 'int32',
+            'latitude': 'float32',
+            'longitude': 'float32',
+            'speed_knots': 'float32',
+            'estimated_dwt': 'float32',
+            'vessel_name': 'category',
+            'destination': 'category',
+        })
+        # O(1) mmsi -> vessel name lookups for the per-vessel printouts
+        self._name_by_mmsi = dict(
+            self.df.groupby('mmsi', observed=True, sort=False)['vessel_name'].first())
+
+        # Derive calendar columns once; every analysis method reuses them.
+        # datetime64[M] truncation is a C cast, vs per-row strftime.
+        ts = self.df['timestamp']
+        self.df['hour'] = ts.dt.hour.astype('int8')
+        self.df['dow'] = ts.dt.dayofweek.astype('int8')
+        self.df['month'] = ts.dt.tz_localize(None).values.astype('datetime64[M]')
+
+        # Sorted timestamp array (UTC, naive) for binary-search slicing
+        self._ts = ts.dt.tz_localize(None).to_numpy()
+
+    def _build_parquet_cache(self, parquet_path: str):
+        """Stream the CSV into a Parquet sidecar with a fixed columnar schema"""
+        print(f"Building Parquet cache from {self.csv_path}...")
+        writer = pq.ParquetWriter(parquet_path, self.PARQUET_SCHEMA)
+        try:
+            for chunk in pd.read_csv(self.csv_path, usecols=self.ANALYSIS_COLUMNS,
+                                     dtype=self.CSV_DTYPES, parse_dates=['timestamp'],
+                                     chunksize=1_000_000):
+                table = pa.Table.from_pandas(chunk[self.ANALYSIS_COLUMNS], preserve_index=False)
+                writer.write_table(table.cast(self.PARQUET_SCHEMA))
+        finally:
+            writer.close()
+
+    def filter_by_days(self, days: int):
+        """Restrict the dataset to the most recent N days"""
+        # The frame is sorted on timestamp, so the cutoff is a binary search
+        # plus one tail slice - no full-column boolean mask
+        cutoff = np.datetime64(datetime.now(timezone.utc).replace(tzinfo=None)) - np.timedelta64(days, 'D')
+        i = int(np.searchsorted(self._ts, cutoff))
+        self.df = self.df.iloc[i:].copy()
+        self._ts = self._ts[i:]
+        self._valid_speed = None
+        print(f"Filtered to last {days} days: {len(self.df):,} records")
+
+    def basic_statistics(self, out=sys.stdout):
+        """Print overall dataset statistics"""
+        total_records = len(self.df)
+        unique_vessels = self.df['mmsi'].nunique()
+        # One fused aggregation instead of six separate column reductions
+        stats = self.df.agg({'timestamp': ['min', 'max'],
+                             'latitude': ['min', 'max'],
+                             'longitude': ['min', 'max']})
+        print(f"""
+{'='*60}
+BASIC STATISTICS
+{'='*60}
+Total Position Records: {total_records:,}
+Unique Vessels: {unique_vessels:,}
+Date Range: {stats.loc['min', 'timestamp']} to {stats.loc['max', 'timestamp']}
+Latitude Range: {stats.loc['min', 'latitude']:.2f} to {stats.loc['max', 'latitude']:.2f}
+Longitude Range: {stats.loc['min', 'longitude']:.2f} to {stats.loc['max', 'longitude']:.2f}""", file=out)
+
+    def vessel_size_analysis(self, out=sys.stdout):
+        """Break down the fleet by estimated DWT"""
+        print(f"\n{'='*60}\nVESSEL SIZE DISTRIBUTION (ESTIMATED DWT)\n{'='*60}", file=out)
+        dwt = self.df.drop_duplicates('mmsi')['estimated_dwt'].dropna().to_numpy()
+        if len(dwt) == 0:
+            print("No DWT estimates available", file=out)
+            return
+
+        labels = ['Handymax', 'Supramax', 'Ultramax',
+                  'Panamax', 'Kamsarmax', 'Post-Panamax']
+        edges = np.arange(40000, 100001, 10000)
+        # One classification pass over the DWT array instead of one
+        # boolean mask per size bucket
+        idx = np.searchsorted(edges, dwt, side='right')
+        counts = np.bincount(idx, minlength=len(edges) + 1)[1:len(edges)]
+        for lo, hi, label, count in zip(edges[:-1], edges[1:], labels, counts):
+            bar = '█' * int(40 * count / len(dwt))
+            print(f"{label:>14} ({lo//1000}k-{hi//1000}k): {count:4d} {bar}", file=out)
+        print(f"\nAverage DWT: {dwt.mean():,.0f}", file=out)
+        print(f"Median DWT: {np.median(dwt):,.0f}", file=out)
+
+    def activity_analysis(self, out=sys.stdout):
+        """Analyze vessel speeds and activity patterns"""
+        speed = self.df['speed_knots'].to_numpy()
+        if self._valid_speed is None:
+            self._valid_speed = ~np.isnan(speed)
+        speed = speed[self._valid_speed]
+
+        # One fused pass over the speed array instead of a mask per bucket
+        anchored, slow, normal, fast = np.bincount(
+            np.searchsorted([1, 5, 12], speed, side='right'), minlength=4)
+        total = len(speed)
+
+        hourly = self.df['hour'].value_counts().sort_index()
+        peak_hour = hourly.idxmax()
+        print(f"""
+{'='*60}
+ACTIVITY ANALYSIS
+{'='*60}
+Average Speed: {speed.mean():.1f} knots
+Median Speed: {np.median(speed):.1f} knots
+Max Speed: {speed.max():.1f} knots
+
+Anchored/Moored (<1 kt): {anchored:,} ({100*anchored/total:.1f}%)
+Slow Steaming (1-5 kt): {slow:,} ({100*slow/total:.1f}%)
+Normal Transit (5-12 kt): {normal:,} ({100*normal/total:.1f}%)
+Fast Transit (>12 kt): {fast:,} ({100*fast/total:.1f}%)
+
+Peak Reporting Hour (UTC): {peak_hour:02d}:00 ({hourly.max():,} records)""", file=out)
+
+    def geographic_analysis(self, out=sys.stdout):
+        """Classify positions into rough ocean regions"""
+        print(f"\n{'='*60}\nGEOGRAPHIC DISTRIBUTION\n{'='*60}", file=out)
+        # Single classification pass: one int8 region code per position
+        # instead of one full-frame boolean mask per region
+        lat = self.df['latitude'].to_numpy()
+        lon = self.df['longitude'].to_numpy()
+        region_names = ['Mediterranean', 'North Atlantic', 'North Pacific',
+                        'Indian Ocean', 'Southern Hemisphere', 'Other']
+        conds = [
+            (lat >= 30) & (lat <= 46) & (lon >= -6) & (lon <= 36),
+            (lat > 20) & (lon > -80) & (lon < -5),
+            (lat > 20) & ((lon > 120) | (lon < -100)),
+            (lat < 30) & (lat > -40) & (lon > 40) & (lon < 110),
+            lat < -20,
+        ]
+        codes = np.select(conds, np.arange(len(conds), dtype=np.int8), default=len(conds))
+        counts = np.bincount(codes, minlength=len(region_names))
+        total = len(self.df)
+        for name, count in zip(region_names, counts):
+            print(f"{name:>22}: {count:8,} ({100*count/total:.1f}%)", file=out)
+
+    def destination_analysis(self, out=sys.stdout):
+        """Show the most common reported destinations"""
+        print(f"\n{'='*60}\nTOP DESTINATIONS\n{'='*60}", file=out)
+        # Resolve the placeholder values to their category codes once and
+        # mask on the int code array - no per-row string compares
+        categories = self.df['destination'].cat.categories
+        bad = [categories.get_loc(x) for x in ('Unknown', '') if x in categories]
+        codes = self.df['destination'].cat.codes.to_numpy()
+        mask = (codes >= 0) & ~np.isin(codes, bad)
+        if not mask.any():
+            print("No destination data available", file=out)
+            return
+        # Partial-sort top 10 on the int category codes: O(U) argpartition
+        # instead of fully sorting every unique destination
+        counts = np.bincount(codes[mask])
+        k = min(10, len(counts))
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.argsort(-counts[top])]
+        # With fewer than k real destinations the partition pads out with
+        # zero-count (masked or absent) codes - drop those
+        top = top[counts[top] > 0]
+        for code in top:
+            print(f"{str(categories[code]):>20}: {counts[code]:,} reports", file=out)
+
+    def temporal_analysis(self, out=sys.stdout):
+        """Analyze reporting patterns over time"""
+        print(f"\n{'='*60}\nTEMPORAL PATTERNS\n{'='*60}", file=out)
+        day_names = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday',
+                              'Friday', 'Saturday', 'Sunday'])
+        day_counts = self.df['dow'].value_counts().sort_index()
+        print("Records by Day of Week:", file=out)
+        for dow, count in day_counts.items():
+            print(f"  {day_names[dow]:>10}: {count:,}", file=out)
+
+        month_counts = self.df['month'].value_counts().sort_index()
+        print("\nRecords by Month:", file=out)
+        for month, count in month_counts.items():
+            print(f"  {np.datetime_as_string(month.to_numpy(), unit='M')}: {count:,}", file=out)
+
+    def vessel_insights(self, out=sys.stdout):
+        """Per-vessel activity highlights"""
+        print(f"\n{'='*60}\nVESSEL INSIGHTS\n{'='*60}", file=out)
+
+        mmsis, counts = np.unique(self.df['mmsi'].to_numpy(), return_counts=True)
+        k = min(10, len(counts))
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.argsort(-counts[top])]
+        print("Most Tracked Vessels:", file=out)
+        for idx in top:
+            mmsi = mmsis[idx]
+            name = self._name_by_mmsi[mmsi]
+            print(f"  {name} ({mmsi}): {counts[idx]:,} positions", file=out)
+
+        fastest = self.df.nlargest(5, 'speed_knots')
+        print("\nFastest Recorded Speeds:", file=out)
+        for _, row in fastest.iterrows():
+            print(f"  {row['vessel_name']} ({row['mmsi']}): {row['speed_knots']:.1f} knots", file=out)
+
+        # Tracking durations in one C-level aggregation
+        journeys = self.df.groupby('mmsi', observed=True, sort=False)['timestamp'].agg(
+            tmin='min', tmax='max', cnt='count')
+        journeys['hours'] = (journeys['tmax'] - journeys['tmin']).dt.total_seconds() / 3600
+        print("\nLongest Tracking Durations:", file=out)
+        for mmsi, row in journeys.nlargest(5, 'hours').iterrows():
+            name = self._name_by_mmsi[mmsi]
+            print(f"  {name} ({mmsi}): {row['hours']:.1f} hours ({int(row['cnt']):,} positions)", file=out)
+
+        # Distance traveled: haversine over consecutive positions, run as a
+        # per-vessel kernel on contiguous arrays (numba-parallel if present)
+        mmsi_arr = self.df['mmsi'].to_numpy()
+        order = np.lexsort((self.df['timestamp'].to_numpy(), mmsi_arr))
+        lat = self.df['latitude'].to_numpy().astype(np.float64)[order]
+        lon = self.df['longitude'].to_numpy().astype(np.float64)[order]
+        sorted_mmsi = mmsi_arr[order]
+        unique_mmsi, starts = np.unique(sorted_mmsi, return_index=True)
+        offsets = np.append(starts, len(sorted_mmsi)).astype(np.int64)
+        distances = np.zeros(len(unique_mmsi))
+        _haversine_per_group(lat, lon, offsets, distances)
+        print("\nLongest Distances Traveled:", file=out)
+        for idx in np.argsort(-distances)[:5]:
+            mmsi = unique_mmsi[idx]
+            print(f"  {self._name_by_mmsi[mmsi]} ({mmsi}): {distances[idx]:,.0f} km", file=out)
+
+    def create_visualizations(self, output_dir: str = "ais_data/plots"):
+        """Generate analysis plots as PNG files"""
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        plt.style.use('default')
+        sns.set_palette('muted')
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Global position map colored by speed. Rasterize with datashader
+        # when available (C-level 2D aggregation instead of one matplotlib
+        # marker per record); fall back to a plain scatter otherwise.
+        try:
+            import datashader as ds
+            import datashader.transfer_functions as tf
+            cvs = ds.Canvas(plot_width=1500, plot_height=1000)
+            agg = cvs.points(self.df, 'longitude', 'latitude', ds.mean('speed_knots'))
+            img = tf.shade(agg, cmap=plt.cm.viridis)
+            ds.utils.export_image(img, 'vessel_positions_map', export_path=output_dir)
+        except ImportError:
+            plt.figure(figsize=(15, 10))
+            scatter = plt.scatter(self.df['longitude'], self.df['latitude'],
+                                  c=self.df['speed_knots'], cmap='viridis', s=1, alpha=0.5)
+            plt.colorbar(scatter, label='Speed (knots)')
+            plt.xlabel('Longitude')
+            plt.ylabel('Latitude')
+            plt.title('Dry Bulk Vessel Positions')
+            plt.savefig(f'{output_dir}/vessel_positions_map.png', dpi=150, bbox_inches='tight')
+            plt.close()
+
+        # Histograms binned with np.histogram on the raw float32 arrays,
+        # drawn with plt.bar - skips the Series.hist copy/NaN handling
+        def _hist(values, bins, xlabel, title, filename):
+            values = values[~np.isnan(values)]
+            counts, edges = np.histogram(values, bins=bins)
+            plt.figure(figsize=(10, 6))
+            plt.bar((edges[:-1] + edges[1:]) / 2, counts,
+                    width=np.diff(edges), edgecolor='black', alpha=0.7)
+            plt.xlabel(xlabel)
+            plt.ylabel('Count')
+            plt.title(title)
+            plt.savefig(f'{output_dir}/{filename}', dpi=150, bbox_inches='tight')
+            plt.close()
+
+        _hist(self.df['speed_knots'].to_numpy(), 50,
+              'Speed (knots)', 'Speed Distribution', 'speed_distribution.png')
+        _hist(self.df['estimated_dwt'].to_numpy(), 30,
+              'Estimated DWT', 'Vessel Size Distribution', 'dwt_distribution.png')
+
+        # Hourly activity
+        plt.figure(figsize=(10, 6))
+        self.df['hour'].value_counts().sort_index().plot(kind='bar')
+        plt.xlabel('Hour (UTC)')
+        plt.ylabel('Records')
+        plt.title('Reporting Activity by Hour')
+        plt.savefig(f'{output_dir}/hourly_activity.png', dpi=150, bbox_inches='tight')
+        plt.close()
+
+        print(f"Plots saved to {output_dir}/")
+
+    def run_all_analyses(self, out=sys.stdout):
+        """Run every analysis section in order"""
+        self.basic_statistics(out=out)
+        self.vessel_size_analysis(out=out)
+        self.activity_analysis(out=out)
+        self.geographic_analysis(out=out)
+        self.destination_analysis(out=out)
+        self.temporal_analysis(out=out)
+        self.vessel_insights(out=out)
+
+    def generate_summary_report(self, output_file: str = "ais_data/analysis_report.txt"):
+        """Write the full analysis output to a text report.
+
+        The sections are independent and spend their time in NumPy/pandas C
+        code that releases the GIL, so they run on a thread pool; each writes
+        to its own buffer and the buffers are concatenated in section order.
+        """
+        sections = [self.basic_statistics, self.vessel_size_analysis,
+                    self.activity_analysis, self.geographic_analysis,
+                    self.destination_analysis, self.temporal_analysis,
+                    self.vessel_insights]
+        bufs = [io.StringIO() for _ in sections]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            futures = [pool.submit(section, out=buf)
+                       for section, buf in zip(sections, bufs)]
+            for future in futures:
+                future.result()
+
+        report = io.StringIO()
+        print("AIS DRY BULK VESSEL ANALYSIS REPORT", file=report)
+        print(f"Generated: {datetime.now(timezone.utc).isoformat()}", file=report)
+        for buf in bufs:
+            report.write(buf.getvalue())
+        pathlib.Path(output_file).write_text(report.getvalue())
+        print(f"Report written to {output_file}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze collected AIS dry bulk vessel data')
+    parser.add_argument('--csv', default='ais_data/dry_bulk_vessels.csv', help='Path to the position CSV')
+    parser.add_argument('--days', type=int, help='Only analyze the last N days of data')
+    parser.add_argument('--export-report', action='store_true', help='Write analysis to a text report instead of stdout')
+    parser.add_argument('--plots', action='store_true', help='Generate analysis plots')
+    args = parser.parse_args()
+
+    analyzer = AISDataAnalyzer(csv_path=args.csv)
+    if not analyzer.load_data():
+        sys.exit(1)
+
+    if args.days:
+        analyzer.filter_by_days(args.days)
+        if analyzer.df.empty:
+            print(f"No records within the last {args.days} days - nothing to analyze")
+            return
+
+    if args.export_report:
+        analyzer.generate_summary_report()
+    else:
+        analyzer.run_all_analyses()
+
+    if args.plots:
+        analyzer.create_visualizations()
+
+if __name__ == "__main__":
+    main()